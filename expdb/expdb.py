@@ -1,37 +1,82 @@
+import collections
 import contextlib
-import getpass
-import hashlib
-import io
+import copy
+import functools
 import json
 import os
-import pathlib
-import pickle
-import uuid
-from datetime import datetime, timezone
+from datetime import timedelta, timezone
 
 from loguru import logger
-import numpy as np
 import sqlalchemy as sqla
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext import baked
 from sqlalchemy.ext.declarative import \
     declarative_base as sqla_declarative_base
-from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy_utils import database_exists, create_database
 
 sqlalchemy_base = sqla_declarative_base()
+bakery = baked.bakery()
+
+# 'select' leaves child collections to lazy loading.
+CHILD_LOADERS = ('select', 'selectin', 'subquery')
+
+# Stored as binary JSONB on PostgreSQL so it is parsed once on insert and can
+# be GIN indexed.
+JSON_DATA_TYPE = sqla.JSON().with_variant(JSONB(), 'postgresql')
+
+# SQLite compares datetimes as strings and CURRENT_TIMESTAMP stores whole
+# seconds, so bound values have to be written without the fraction too.
+CREATION_TIME_TYPE = sqla.DateTime(timezone=False).with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d '
+                    '%(hour)02d:%(minute)02d:%(second)02d'), 'sqlite')
+
+
+UUID_ALPHABET = b'23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+# Random bytes below the largest multiple of len(UUID_ALPHABET) map uniformly
+# onto the alphabet, the rest are dropped.
+UUID_ACCEPT_LIMIT = 256 - 256 % len(UUID_ALPHABET)
+UUID_TRANSLATION = bytes.maketrans(
+    bytes(range(UUID_ACCEPT_LIMIT)),
+    UUID_ALPHABET * (UUID_ACCEPT_LIMIT // len(UUID_ALPHABET)))
+UUID_REJECTED_BYTES = bytes(range(UUID_ACCEPT_LIMIT, 256))
+# Number of symbols needed to cover the 128 bits of a uuid4.
+UUID_FULL_LENGTH = 22
 
 
 def gen_short_uuid(num_chars=None):
-    num = uuid.uuid4().int
-    alphabet = '23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-    res = []
-    while num > 0:
-        num, digit = divmod(num, len(alphabet))
-        res.append(alphabet[digit])
-    res2 = ''.join(reversed(res))
     if num_chars is None:
-        return res2
-    else:
-        return res2[:num_chars]
+        num_chars = UUID_FULL_LENGTH
+    res = b''
+    while len(res) < num_chars:
+        res += os.urandom(num_chars + 4).translate(UUID_TRANSLATION,
+                                                   UUID_REJECTED_BYTES)
+    return res[:num_chars].decode('ascii')
+
+
+def to_naive_utc(dt):
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def like_contains_pattern(x):
+    escaped = x.replace('/', '//').replace('%', '/%').replace('_', '/_')
+    return f'%{escaped}%'
+
+
+def enable_sqlite_case_sensitive_like(dbapi_connection, connection_record):
+    # Name filters use LIKE, which ignores ASCII case on SQLite by default
+    # but not on PostgreSQL.
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA case_sensitive_like=ON')
+    cursor.close()
+
+
+def enable_sqlite_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
 
 
 def is_jsonable(x):
@@ -42,22 +87,47 @@ def is_jsonable(x):
         return False
 
 
+def row_snapshot(obj):
+    return {
+        attr.key: copy.deepcopy(getattr(obj, attr.key))
+        for attr in sqla.inspect(obj).mapper.column_attrs
+    }
+
+
+def detached_copy(cls, snapshot):
+    obj = cls(**copy.deepcopy(snapshot))
+    sqla.orm.make_transient_to_detached(obj)
+    return obj
+
+
 class ExperimentState(sqlalchemy_base):
     __tablename__ = 'experiment_state'
     uuid = sqla.Column(sqla.String, primary_key=True)
     name = sqla.Column(sqla.String, unique=True)
     tags = sqla.Column(sqla.String)
-    data = sqla.Column(sqla.JSON)
+    data = sqla.Column(JSON_DATA_TYPE)
     experiment_uuid = sqla.Column(sqla.String,
                                   sqla.ForeignKey('experiment.uuid'),
                                   nullable=True)
     description = sqla.Column(sqla.String)
-    creation_time = sqla.Column(sqla.DateTime(timezone=False),
-                                server_default=sqla.sql.func.now())
+    creation_time = sqla.Column(CREATION_TIME_TYPE,
+                                server_default=sqla.sql.func.now(),
+                                index=True)
     experiment = sqla.orm.relationship('Experiment',
                                        back_populates='states',
                                        foreign_keys=[experiment_uuid])
     hidden = sqla.Column(sqla.Boolean)
+    __table_args__ = (
+        sqla.Index('ix_experiment_state_hidden_experiment_creation',
+                   'hidden',
+                   'experiment_uuid',
+                   'creation_time',
+                   postgresql_where=sqla.text('hidden = false')),
+        sqla.Index('ix_experiment_state_hidden_creation',
+                   'hidden',
+                   'creation_time',
+                   postgresql_where=sqla.text('hidden = false')),
+    )
 
     def __repr__(self):
         return f'<ExperimentState(uuid="{self.uuid}", name="{self.name}", tags="{self.tags}",  creation_time="{self.creation_time}", hidden="{self.hidden}")>'
@@ -68,13 +138,15 @@ class Experiment(sqlalchemy_base):
     uuid = sqla.Column(sqla.String, primary_key=True)
     name = sqla.Column(sqla.String, unique=True)
     tags = sqla.Column(sqla.String)
-    data = sqla.Column(sqla.JSON)
+    data = sqla.Column(JSON_DATA_TYPE)
     project_name = sqla.Column(sqla.String,
                                sqla.ForeignKey('project.name'),
-                               nullable=True)
+                               nullable=True,
+                               index=True)
     description = sqla.Column(sqla.String)
-    creation_time = sqla.Column(sqla.DateTime(timezone=False),
-                                server_default=sqla.sql.func.now())
+    creation_time = sqla.Column(CREATION_TIME_TYPE,
+                                server_default=sqla.sql.func.now(),
+                                index=True)
     project = sqla.orm.relationship('Project',
                                     back_populates='experiments',
                                     foreign_keys=[project_name])
@@ -84,6 +156,17 @@ class Experiment(sqlalchemy_base):
         cascade='all, delete, delete-orphan',
         foreign_keys='ExperimentState.experiment_uuid')
     hidden = sqla.Column(sqla.Boolean)
+    __table_args__ = (
+        sqla.Index('ix_experiment_hidden_project_creation',
+                   'hidden',
+                   'project_name',
+                   'creation_time',
+                   postgresql_where=sqla.text('hidden = false')),
+        sqla.Index('ix_experiment_hidden_creation',
+                   'hidden',
+                   'creation_time',
+                   postgresql_where=sqla.text('hidden = false')),
+    )
 
     def __repr__(self):
         return f'<Experiment(uuid="{self.uuid}", name="{self.name}", tags="{self.tags}",  creation_time="{self.creation_time}", hidden="{self.hidden}")>'
@@ -97,23 +180,53 @@ class Project(sqlalchemy_base):
                        primary_key=True)
     tags = sqla.Column(sqla.String)
     description = sqla.Column(sqla.String)
-    data = sqla.Column(sqla.JSON)
-    creation_time = sqla.Column(sqla.DateTime(timezone=False),
+    data = sqla.Column(JSON_DATA_TYPE)
+    creation_time = sqla.Column(CREATION_TIME_TYPE,
                                 server_default=sqla.sql.func.now())
     experiments = sqla.orm.relationship('Experiment',
                                         back_populates='project',
                                         cascade='all, delete, delete-orphan',
                                         foreign_keys='Experiment.project_name')
     hidden = sqla.Column(sqla.Boolean)
+    __table_args__ = (sqla.Index(
+        'ix_project_hidden_creation',
+        'hidden',
+        'creation_time',
+        postgresql_where=sqla.text('hidden = false')), )
 
     def __repr__(self):
         return f'<Project(name="{self.name}", tags="{self.tags}", creation_time="{self.creation_time}", hidden="{self.hidden}")>'
 
 
+def add_data_gin_index(table):
+    # GIN indexes are PostgreSQL only, other backends would build a plain
+    # index on the whole JSON value.
+    sqla.event.listen(
+        table, 'after_create',
+        sqla.DDL(f'CREATE INDEX ix_{table.name}_data_gin '
+                 f'ON {table.name} USING gin (data)').execute_if(
+                     dialect='postgresql'))
+
+
+add_data_gin_index(ExperimentState.__table__)
+add_data_gin_index(Experiment.__table__)
+add_data_gin_index(Project.__table__)
+
+
+MODELS_BY_KIND = {
+    'project': Project,
+    'experiment': Experiment,
+    'experiment_state': ExperimentState
+}
+
+
 class ExpDB(object):
     def __init__(self,
                  db_connection_string=None,
-                 sql_verbose=False):
+                 sql_verbose=False,
+                 ensure_schema=True,
+                 read_cache_size=0,
+                 sqlite_wal=False):
 
         if db_connection_string is None:
             EXPDB_PATH = os.getenv("EXPDB_PATH")
@@ -125,14 +238,45 @@ class ExpDB(object):
                 db_connection_string = EXPDB_PATH
         self.sql_verbose = sql_verbose
         self.db_connection_string = db_connection_string
-        self.engine = sqla.create_engine(self.db_connection_string,
-                                         echo=self.sql_verbose)
-        self.sessionmaker = sqla.orm.sessionmaker(bind=self.engine,
-                                                  expire_on_commit=False)
+        self.ensure_schema = ensure_schema
         self.uuid_length = 10
-        if not database_exists(self.engine.url):
-            create_database(self.engine.url)
-            sqlalchemy_base.metadata.create_all(bind=self.engine)
+        self.read_cache_size = read_cache_size
+        # WAL mode is stored in the database file and does not work on
+        # network filesystems, so it is only turned on when asked for.
+        self.sqlite_wal = sqlite_wal
+        self.read_cache = collections.OrderedDict()
+
+    # The engine is only created (and the schema only checked) on first use,
+    # so constructing an ExpDB never touches the database.
+    @functools.cached_property
+    def engine(self):
+        engine_kwargs = {}
+        url = sqla.engine.url.make_url(self.db_connection_string)
+        is_sqlite = url.get_backend_name() == 'sqlite'
+        if is_sqlite:
+            engine_kwargs['connect_args'] = {'check_same_thread': False}
+        if url.get_driver_name() == 'psycopg2':
+            # Send executemany() batches (e.g. the bulk creates) through
+            # psycopg2's execute_batch instead of one round trip per row.
+            engine_kwargs['use_batch_mode'] = True
+        engine = sqla.create_engine(self.db_connection_string,
+                                    echo=self.sql_verbose,
+                                    pool_pre_ping=True,
+                                    pool_recycle=3600,
+                                    **engine_kwargs)
+        if is_sqlite:
+            sqla.event.listen(engine, 'connect',
+                              enable_sqlite_case_sensitive_like)
+            if self.sqlite_wal:
+                sqla.event.listen(engine, 'connect', enable_sqlite_wal)
+        if self.ensure_schema and not database_exists(engine.url):
+            create_database(engine.url)
+            sqlalchemy_base.metadata.create_all(bind=engine)
+        return engine
+
+    @functools.cached_property
+    def sessionmaker(self):
+        return sqla.orm.sessionmaker(bind=self.engine, expire_on_commit=False)
 
     @contextlib.contextmanager
     def session_scope(self):
@@ -173,6 +317,69 @@ class ExpDB(object):
 
         return self.run_query_with_optional_session(query, session)
 
+    def run_baked_query(self,
+                        baked_query,
+                        params,
+                        *,
+                        session=None,
+                        yield_per=None):
+        if yield_per is None:
+
+            def query(sess):
+                return baked_query(sess).params(**params).all()
+
+            return self.run_query_with_optional_session(query, session)
+        # Streamed rows are fetched while iterating, so the caller has to keep
+        # its session open until it is done with them.
+        assert session is not None
+        return baked_query(session).params(**params).with_post_criteria(
+            lambda q: q.yield_per(yield_per))
+
+    def creation_time_after(self, after):
+        after = to_naive_utc(after)
+        if self.engine.dialect.name == 'sqlite' and after.microsecond > 0:
+            # Bound values lose their fraction on SQLite, round up so that
+            # rows from the second before a fractional bound stay excluded.
+            after = after.replace(microsecond=0) + timedelta(seconds=1)
+        return after
+
+    def run_cached_get(self, cls, pk, get_fn):
+        # Only rows fetched outside of a caller's session are cached, and any
+        # write through this ExpDB drops the affected entries. Writes made
+        # through other ExpDB instances are not seen, so the cache is off
+        # unless read_cache_size is set. Entries are column snapshots and
+        # every hit gets its own detached copy, so callers can't change what
+        # later calls return.
+        if self.read_cache_size <= 0:
+            return get_fn()
+        key = (cls, pk)
+        if key in self.read_cache:
+            self.read_cache.move_to_end(key)
+            return detached_copy(cls, self.read_cache[key])
+        result = get_fn()
+        if result is not None:
+            self.read_cache[key] = row_snapshot(result)
+            if len(self.read_cache) > self.read_cache_size:
+                self.read_cache.popitem(last=False)
+        return result
+
+    def invalidate_cached(self, cls, pks=None):
+        if pks is None:
+            pks = [pk for key_cls, pk in self.read_cache if key_cls is cls]
+        for pk in pks:
+            self.read_cache.pop((cls, pk), None)
+
+    def run_get_by_pk(self, cls, pk, *, session=None, show_hidden=False):
+        # Primary key lookups go through the identity map and skip the
+        # expanding IN machinery of the listing queries.
+        def query(sess):
+            result = sess.query(cls).get(pk)
+            if result is None or (result.hidden and not show_hidden):
+                return []
+            return [result]
+
+        return self.run_query_with_optional_session(query, session)
+
     def create_project(self,
                        *,
                        name,
@@ -191,33 +398,90 @@ class ExpDB(object):
             session.add(new_project)
         return self.get_project(name=name, assert_exists=True)
 
-    def get_project(self, name=None, *, session=None, assert_exists=True):
+    def get_project(self,
+                    name=None,
+                    *,
+                    session=None,
+                    assert_exists=True,
+                    loader='select'):
         def get_fn(sess):
-            return self.get_projects(names=[name], session=sess)
-
-        return self.run_get(name,
-                            get_fn,
-                            session=session,
-                            assert_exists=assert_exists)
-
-    def get_projects(self, names=None, *, session=None, show_hidden=False):
-        cur_options = []
-        cur_options.append(
-            sqla.orm.subqueryload(Project.experiments).subqueryload(
-                Experiment.states))
+            return self.get_projects(names=[name], session=sess, loader=loader)
+
+        def run():
+            return self.run_get(name,
+                                get_fn,
+                                session=session,
+                                assert_exists=assert_exists)
+
+        if session is not None or loader != 'select':
+            return run()
+        return self.run_cached_get(Project, name, run)
+
+    def get_projects(self,
+                     names=None,
+                     *,
+                     session=None,
+                     show_hidden=False,
+                     after=None,
+                     before=None,
+                     name_contains=None,
+                     order_by_creation=False,
+                     loader='select',
+                     yield_per=None):
+        assert loader in CHILD_LOADERS
+        assert yield_per is None or loader == 'select'
+        if names is not None:
+            names = list(names)
+            if (len(names) == 1 and loader == 'select' and all(
+                    x is None for x in (after, before, name_contains))):
+                return self.run_get_by_pk(Project,
+                                          names[0],
+                                          session=session,
+                                          show_hidden=show_hidden)
+
+        # Values are passed as bound parameters so that the compiled
+        # statement for each combination of filters is cached by the bakery.
+        baked_query = bakery(lambda s: s.query(Project))
+        params = {}
+        if loader == 'selectin':
+            baked_query += lambda q: q.options(
+                sqla.orm.selectinload(Project.experiments).selectinload(
+                    Experiment.states))
+        elif loader == 'subquery':
+            baked_query += lambda q: q.options(
+                sqla.orm.subqueryload(Project.experiments).subqueryload(
+                    Experiment.states))
 
-        filter_list = []
         if not show_hidden:
-            filter_list.append(Project.hidden == False)
+            baked_query += lambda q: q.filter(Project.hidden == False)
 
         if names is not None:
-            filter_list.append(Project.name.in_(names))
-
-        def query(sess):
-            return sess.query(Project).options(cur_options).filter(
-                *filter_list).all()
-
-        return self.run_query_with_optional_session(query, session)
+            baked_query += lambda q: q.filter(
+                Project.name.in_(sqla.bindparam('names', expanding=True)))
+            params['names'] = names
+
+        if after is not None:
+            baked_query += lambda q: q.filter(
+                Project.creation_time >= sqla.bindparam('after'))
+            params['after'] = self.creation_time_after(after)
+
+        if before is not None:
+            baked_query += lambda q: q.filter(
+                Project.creation_time <= sqla.bindparam('before'))
+            params['before'] = to_naive_utc(before)
+
+        if name_contains is not None:
+            baked_query += lambda q: q.filter(
+                Project.name.like(sqla.bindparam('name_pattern'), escape='/'))
+            params['name_pattern'] = like_contains_pattern(name_contains)
+
+        if order_by_creation:
+            baked_query += lambda q: q.order_by(Project.creation_time)
+
+        return self.run_baked_query(baked_query,
+                                    params,
+                                    session=session,
+                                    yield_per=yield_per)
 
     def create_experiment(self,
                           *,
@@ -242,67 +506,150 @@ class ExpDB(object):
             session.add(new_exp)
         return self.get_experiment(uuid=new_id, assert_exists=True)
 
+    def create_experiments_bulk(self, *, project_name, records):
+        assert isinstance(project_name, str)
+        mappings = []
+        for record in records:
+            assert is_jsonable(record['data'])
+            mappings.append({
+                'uuid': self.gen_short_uuid(),
+                'project_name': project_name,
+                'name': record.get('name'),
+                'description': record.get('description'),
+                'tags': record.get('tags'),
+                'data': record['data'],
+                'hidden': False
+            })
+        if len(mappings) > 0:
+            with self.session_scope() as session:
+                session.execute(Experiment.__table__.insert(), mappings)
+        return [x['uuid'] for x in mappings]
+
+    def _update_data(self, cls, pk, data):
+        self.invalidate_cached(cls, [pk])
+        pk_column = sqla.inspect(cls).primary_key[0]
+        filter_list = [pk_column == pk, cls.hidden == False]
+        with self.session_scope() as session:
+            if self.engine.dialect.name == 'postgresql':
+                # Merge server side with jsonb ||, which like dict.update
+                # replaces top-level keys.
+                merged = sqla.cast(cls.data, JSONB).op('||')(sqla.cast(
+                    data, JSONB))
+            else:
+                current = session.query(cls.data).filter(
+                    *filter_list).with_for_update().one_or_none()
+                assert current is not None
+                merged = dict(current.data)
+                merged.update(data)
+            num_updated = session.query(cls).filter(*filter_list).update(
+                {cls.data: merged}, synchronize_session=False)
+            assert num_updated == 1
+
     def update_project_data(self, *, name, data):
         assert isinstance(name, str)
         assert is_jsonable(data)
-        with self.session_scope() as session:
-            project = self.get_project(name,
-                                       session=session,
-                                       assert_exists=True)
-            project.data.update(data)
-            flag_modified(project, "data")
-            session.add(project)
-            session.commit()
+        self._update_data(Project, name, data)
 
     def update_experiment_data(self, *, uuid, data):
         assert isinstance(uuid, str)
         assert is_jsonable(data)
-        with self.session_scope() as session:
-            experiment = self.get_experiment(uuid,
-                                             session=session,
-                                             assert_exists=True)
-            experiment.data.update(data)
-            flag_modified(experiment, "data")
-            session.add(experiment)
-            session.commit()
+        self._update_data(Experiment, uuid, data)
 
     def update_experiment_state_data(self, *, uuid, data):
         assert isinstance(uuid, str)
         assert is_jsonable(data)
-        with self.session_scope() as session:
-            state = self.get_experiment_state(uuid,
-                                              session=session,
-                                              assert_exists=True)
-            state.data.update(data)
-            flag_modified(state, "data")
-            session.add(state)
-            session.commit()
+        self._update_data(ExperimentState, uuid, data)
 
-    def get_experiment(self, uuid=None, *, session=None, assert_exists=True):
+    def get_experiment(self,
+                       uuid=None,
+                       *,
+                       session=None,
+                       assert_exists=True,
+                       loader='select'):
         def get_fn(sess):
-            return self.get_experiments(uuids=[uuid], session=sess)
-
-        return self.run_get(uuid,
-                            get_fn,
-                            session=session,
-                            assert_exists=assert_exists)
-
-    def get_experiments(self, uuids=None, *, session=None, show_hidden=False):
-        cur_options = []
-        cur_options.append(sqla.orm.subqueryload(Experiment.states))
+            return self.get_experiments(uuids=[uuid],
+                                        session=sess,
+                                        loader=loader)
+
+        def run():
+            return self.run_get(uuid,
+                                get_fn,
+                                session=session,
+                                assert_exists=assert_exists)
+
+        if session is not None or loader != 'select':
+            return run()
+        return self.run_cached_get(Experiment, uuid, run)
+
+    def get_experiments(self,
+                        uuids=None,
+                        *,
+                        session=None,
+                        show_hidden=False,
+                        after=None,
+                        before=None,
+                        name_contains=None,
+                        project_name=None,
+                        order_by_creation=False,
+                        loader='select',
+                        yield_per=None):
+        assert loader in CHILD_LOADERS
+        assert yield_per is None or loader == 'select'
+        if uuids is not None:
+            uuids = list(uuids)
+            if (len(uuids) == 1 and loader == 'select' and all(
+                    x is None
+                    for x in (after, before, name_contains, project_name))):
+                return self.run_get_by_pk(Experiment,
+                                          uuids[0],
+                                          session=session,
+                                          show_hidden=show_hidden)
+
+        baked_query = bakery(lambda s: s.query(Experiment))
+        params = {}
+        if loader == 'selectin':
+            baked_query += lambda q: q.options(
+                sqla.orm.selectinload(Experiment.states))
+        elif loader == 'subquery':
+            baked_query += lambda q: q.options(
+                sqla.orm.subqueryload(Experiment.states))
 
-        filter_list = []
         if not show_hidden:
-            filter_list.append(Experiment.hidden == False)
+            baked_query += lambda q: q.filter(Experiment.hidden == False)
 
         if uuids is not None:
-            filter_list.append(Experiment.uuid.in_(uuids))
-
-        def query(sess):
-            return sess.query(Experiment).options(cur_options).filter(
-                *filter_list).all()
-
-        return self.run_query_with_optional_session(query, session)
+            baked_query += lambda q: q.filter(
+                Experiment.uuid.in_(sqla.bindparam('uuids', expanding=True)))
+            params['uuids'] = uuids
+
+        if after is not None:
+            baked_query += lambda q: q.filter(
+                Experiment.creation_time >= sqla.bindparam('after'))
+            params['after'] = self.creation_time_after(after)
+
+        if before is not None:
+            baked_query += lambda q: q.filter(
+                Experiment.creation_time <= sqla.bindparam('before'))
+            params['before'] = to_naive_utc(before)
+
+        if name_contains is not None:
+            baked_query += lambda q: q.filter(
+                Experiment.name.like(sqla.bindparam('name_pattern'),
+                                     escape='/'))
+            params['name_pattern'] = like_contains_pattern(name_contains)
+
+        if project_name is not None:
+            baked_query += lambda q: q.filter(
+                Experiment.project_name == sqla.bindparam('project_name'))
+            params['project_name'] = project_name
+
+        if order_by_creation:
+            baked_query += lambda q: q.order_by(Experiment.creation_time)
+
+        return self.run_baked_query(baked_query,
+                                    params,
+                                    session=session,
+                                    yield_per=yield_per)
 
     def create_experiment_state(self,
                                 *,
@@ -327,6 +674,25 @@ class ExpDB(object):
             session.add(new_exp)
         return self.get_experiment_state(uuid=new_id, assert_exists=True)
 
+    def create_experiment_states_bulk(self, *, experiment_uuid, records):
+        assert isinstance(experiment_uuid, str)
+        mappings = []
+        for record in records:
+            assert is_jsonable(record['data'])
+            mappings.append({
+                'uuid': self.gen_short_uuid(),
+                'experiment_uuid': experiment_uuid,
+                'name': record.get('name'),
+                'description': record.get('description'),
+                'tags': record.get('tags'),
+                'data': record['data'],
+                'hidden': False
+            })
+        if len(mappings) > 0:
+            with self.session_scope() as session:
+                session.execute(ExperimentState.__table__.insert(), mappings)
+        return [x['uuid'] for x in mappings]
+
     def get_experiment_state(self,
                              uuid=None,
                              *,
@@ -344,43 +710,135 @@ class ExpDB(object):
                               uuids=None,
                               *,
                               session=None,
-                              show_hidden=False):
-        cur_options = []
-        filter_list = []
+                              show_hidden=False,
+                              after=None,
+                              before=None,
+                              name_contains=None,
+                              order_by_creation=False,
+                              yield_per=None):
+        if uuids is not None:
+            uuids = list(uuids)
+            if len(uuids) == 1 and all(
+                    x is None for x in (after, before, name_contains)):
+                return self.run_get_by_pk(ExperimentState,
+                                          uuids[0],
+                                          session=session,
+                                          show_hidden=show_hidden)
+
+        baked_query = bakery(lambda s: s.query(ExperimentState))
+        params = {}
 
         if not show_hidden:
-            filter_list.append(ExperimentState.hidden == False)
+            baked_query += lambda q: q.filter(ExperimentState.hidden == False)
 
         if uuids is not None:
-            filter_list.append(ExperimentState.uuid.in_(uuids))
+            baked_query += lambda q: q.filter(
+                ExperimentState.uuid.in_(
+                    sqla.bindparam('uuids', expanding=True)))
+            params['uuids'] = uuids
+
+        if after is not None:
+            baked_query += lambda q: q.filter(
+                ExperimentState.creation_time >= sqla.bindparam('after'))
+            params['after'] = self.creation_time_after(after)
+
+        if before is not None:
+            baked_query += lambda q: q.filter(
+                ExperimentState.creation_time <= sqla.bindparam('before'))
+            params['before'] = to_naive_utc(before)
+
+        if name_contains is not None:
+            baked_query += lambda q: q.filter(
+                ExperimentState.name.like(sqla.bindparam('name_pattern'),
+                                          escape='/'))
+            params['name_pattern'] = like_contains_pattern(name_contains)
+
+        if order_by_creation:
+            baked_query += lambda q: q.order_by(ExperimentState.creation_time)
+
+        return self.run_baked_query(baked_query,
+                                    params,
+                                    session=session,
+                                    yield_per=yield_per)
 
+    def hide_experiment_state(self, experiment_state_uuid, *, session=None):
         def query(sess):
-            return sess.query(ExperimentState).options(cur_options).filter(
-                *filter_list).all()
-
-        return self.run_query_with_optional_session(query, session)
-
-    def hide_experiment_state(self, experiment_state_uuid):
-        with self.session_scope() as session:
             state = self.get_experiment_state(experiment_state_uuid,
-                                              session=session,
+                                              session=sess,
                                               assert_exists=True)
             state.hidden = True
 
-    def hide_project(self, project_name):
-        with self.session_scope() as session:
+        self.run_query_with_optional_session(query, session)
+
+    def hide_project(self, project_name, *, session=None):
+        self.invalidate_cached(Project, [project_name])
+
+        def query(sess):
             proj = self.get_project(project_name,
-                                    session=session,
+                                    session=sess,
                                     assert_exists=True)
             proj.hidden = True
 
-    def hide_experiment(self, experiment_uuid):
-        with self.session_scope() as session:
+        self.run_query_with_optional_session(query, session)
+
+    def hide_experiment(self, experiment_uuid, *, session=None):
+        self.invalidate_cached(Experiment, [experiment_uuid])
+
+        def query(sess):
             exp = self.get_experiment(experiment_uuid,
-                                      session=session,
+                                      session=sess,
                                       assert_exists=True)
             exp.hidden = True
 
+        self.run_query_with_optional_session(query, session)
+
+    def existing_uuids(self, kind, uuids, *, session=None, show_hidden=False):
+        cls = MODELS_BY_KIND[kind]
+        pk_column = sqla.inspect(cls).primary_key[0]
+        uuids = list(uuids)
+        if len(uuids) == 0:
+            return set()
+        filter_list = [pk_column.in_(uuids)]
+        if not show_hidden:
+            filter_list.append(cls.hidden == False)
+
+        def query(sess):
+            return {x[0] for x in sess.query(pk_column).filter(*filter_list)}
+
+        return self.run_query_with_optional_session(query, session)
+
+    def hide_experiments_bulk(self,
+                              uuids=None,
+                              *,
+                              after=None,
+                              before=None,
+                              all_visible=False,
+                              session=None):
+        filter_list = [Experiment.hidden == False]
+        if uuids is not None:
+            uuids = list(uuids)
+            if len(uuids) == 0:
+                return 0
+            filter_list.append(Experiment.uuid.in_(uuids))
+
+        if after is not None:
+            filter_list.append(
+                Experiment.creation_time >= self.creation_time_after(after))
+
+        if before is not None:
+            filter_list.append(
+                Experiment.creation_time <= to_naive_utc(before))
+
+        if len(filter_list) == 1:
+            assert all_visible
+        self.invalidate_cached(Experiment, uuids)
+
+        def query(sess):
+            return sess.query(Experiment).filter(*filter_list).update(
+                {Experiment.hidden: True}, synchronize_session=False)
+
+        return self.run_query_with_optional_session(query, session)
+
 
 
 if __name__ == "__main__":
@@ -1,11 +1,76 @@
 import datetime
+import functools
+import io
+import operator
+import sys
 
 import click
-import dateparser
 
-from expdb import expdb
 
-db = expdb.ExpDB()
+@functools.lru_cache(maxsize=None)
+def get_db():
+    # expdb.expdb pulls in SQLAlchemy, so only import it once a command runs
+    # and keep '--help' fast.
+    from expdb import expdb
+    return expdb.ExpDB()
+
+
+@functools.lru_cache(maxsize=128)
+def parse_iso_datetime(value):
+    if value.endswith('Z'):
+        # fromisoformat only accepts a trailing Z from Python 3.11 on.
+        value = value[:-1] + '+00:00'
+    try:
+        # Naive ISO strings are read as local time, like dateparser does.
+        parsed = datetime.datetime.fromisoformat(value).astimezone()
+    except ValueError:
+        return None
+    from expdb import expdb
+    return expdb.to_naive_utc(parsed)
+
+
+def parse_datetime(value):
+    parsed = parse_iso_datetime(value)
+    if parsed is not None:
+        return parsed
+    # dateparser is slow to import, so only load it for non-ISO input. Its
+    # results are not cached since relative dates like '1 week ago' depend on
+    # the current time.
+    import dateparser
+    parsed = dateparser.parse(value,
+                              settings={'RETURN_AS_TIMEZONE_AWARE': True})
+    if parsed is None:
+        return None
+    from expdb import expdb
+    return expdb.to_naive_utc(parsed)
+
+
+class FlexDateTime(click.ParamType):
+    name = 'datetime'
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, datetime.datetime):
+            return value
+        parsed = parse_datetime(value)
+        if parsed is None:
+            self.fail(f'could not parse {value!r} as a date', param, ctx)
+        return parsed
+
+
+# Listings are fetched from the database and written out in chunks of this
+# many rows.
+LIST_CHUNK_ROWS = 1024
+
+
+UUID_ROW_TEMPLATE = '%s : creation_time %s  name %s tags: %s'
+NAME_ROW_TEMPLATE = '%s : creation_time %s: %s'
+DATA_ROW_TEMPLATE = '\t\t%s: %s\n'
+
+
+def flush_buffer(buf):
+    sys.stdout.write(buf.getvalue())
+    buf.seek(0)
+    buf.truncate()
 
 
 @click.group()
@@ -22,37 +87,27 @@ def hide():
 @click.option('-a', '--all', '_all', type=str, default=None, is_flag=True)
 @click.option('--uuid', type=str, default=None)
 @click.option('--uuid_list', type=str, default=None)
-@click.option('--before', type=str, default=None)
-@click.option('--after', type=str, default=None)
+@click.option('--before', type=FlexDateTime(), default=None)
+@click.option('--after', type=FlexDateTime(), default=None)
 def hide_experiments(_all, uuid, uuid_list, before, after):
+    db = get_db()
     if uuid_list is not None:
         assert uuid is None
-        for cur_uuid in uuid_list.split(','):
-            db.hide_experiment(cur_uuid)
-            print(f'evaluation {cur_uuid} is now hidden')
+        uuids = uuid_list.split(',')
+        with db.session_scope() as sess:
+            present = db.existing_uuids('experiment', uuids, session=sess)
+            db.hide_experiments_bulk(present, session=sess)
+        for cur_uuid in uuids:
+            if cur_uuid in present:
+                print(f'evaluation {cur_uuid} is now hidden')
+            else:
+                print(f'evaluation {cur_uuid} not found or already hidden')
     else:
-        exps = db.get_experiments(show_hidden=False)
-        if after is not None:
-            after_datetime = dateparser.parse(
-                after, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-            exps = [
-                x for x in exps if x.creation_time.replace(
-                    tzinfo=datetime.timezone.utc) >= after_datetime
-            ]
-        if before is not None:
-            before_datetime = dateparser.parse(
-                before, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-            exps = [
-                x for x in exps if x.creation_time.replace(
-                    tzinfo=datetime.timezone.utc) <= before_datetime
-            ]
         if after is None and before is None:
             assert _all
-
-        num_hidden = 0
-        for m in exps:
-            db.hide_experiment(m.uuid)
-            num_hidden += 1
+        num_hidden = db.hide_experiments_bulk(after=after,
+                                              before=before,
+                                              all_visible=_all)
         if num_hidden > 0:
             print(f'Hid {num_hidden} evaluations')
         else:
@@ -66,66 +121,85 @@ def list():
     pass
 
 
+def _list_rows(db,
+               getter_name,
+               *,
+               header_template,
+               header_fields,
+               label,
+               show_hidden,
+               show_data,
+               filter_fields,
+               uuid,
+               name_filter,
+               after,
+               before,
+               skip_empty_data=True,
+               **extra_filters):
+    get_rows = getattr(db, getter_name)
+    get_header = operator.attrgetter(*header_fields)
+    keys_to_show = None
+    if filter_fields is not None:
+        keys_to_show = sorted(set(filter_fields.split(',')))
+    with db.session_scope() as sess:
+        rows = get_rows(None if uuid is None else [uuid],
+                        show_hidden=show_hidden,
+                        after=after,
+                        before=before,
+                        name_contains=name_filter,
+                        order_by_creation=True,
+                        session=sess,
+                        yield_per=LIST_CHUNK_ROWS,
+                        **extra_filters)
+        buf = io.StringIO()
+        for i, m in enumerate(rows):
+            if i > 0 and i % LIST_CHUNK_ROWS == 0:
+                flush_buffer(buf)
+            buf.write(header_template % get_header(m))
+            if show_hidden:
+                buf.write(f'\thidden {m.hidden}')
+            buf.write('\n')
+            if show_data and not (skip_empty_data and len(m.data) == 0):
+                buf.write(f'\tDescription: {m.description}\n')
+                buf.write(label)
+                if isinstance(m.data, dict):
+                    if keys_to_show is None:
+                        keys = sorted(m.data)
+                    else:
+                        keys = [k for k in keys_to_show if k in m.data]
+                    for k in keys:
+                        buf.write(DATA_ROW_TEMPLATE % (k, m.data[k]))
+                else:
+                    buf.write("\t\t" + str(m.data) + '\n')
+                buf.write('\n')
+        flush_buffer(buf)
+
+
 @list.command(name='experiments')
 @click.option('--show_hidden', is_flag=True)
 @click.option('--show_data', is_flag=True)
 @click.option('--filter_fields', type=str, default=None)
 @click.option('--uuid', type=str, default=None)
 @click.option('--name_filter', type=str, default=None)
-@click.option('--after', type=str, default=None)
-@click.option('--before', type=str, default=None)
+@click.option('--after', type=FlexDateTime(), default=None)
+@click.option('--before', type=FlexDateTime(), default=None)
 @click.option('--project', type=str, default=None)
 def list_experiments(show_hidden, show_data, filter_fields, uuid, name_filter,
                      after, before, project):
-    exps = db.get_experiments(show_hidden=show_hidden)
-    exps = sorted(exps, key=lambda x: x.creation_time)
-    if after is not None:
-        after_datetime = dateparser.parse(
-            after, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        exps = [
-            x for x in exps if x.creation_time.replace(
-                tzinfo=datetime.timezone.utc) >= after_datetime
-        ]
-    if before is not None:
-        before_datetime = dateparser.parse(
-            before, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        exps = [
-            x for x in exps if x.creation_time.replace(
-                tzinfo=datetime.timezone.utc) <= before_datetime
-        ]
-    if name_filter is not None:
-        exps = [x for x in exps if name_filter in x.name]
-
-    if uuid is not None:
-        exp = [x for x in exp if str(uuid) == str(x.uuid)]
-
-    for m in exps:
-        if project is not None:
-            if m.project_name != project:
-                continue
-        print(
-            f'{m.uuid} : creation_time {m.creation_time}  name {m.name} tags: {m.tags}',
-            end='')
-        if show_hidden:
-            print(f'\thidden {m.hidden}')
-        else:
-            print()
-        if show_data:
-            print(f'\tDescription: {m.description}')
-            if show_data:
-                keys_to_show = None
-                if filter_fields is not None:
-                    keys_to_show = filter_fields.split(',')
-                print('\tExperiment :')
-                if isinstance(m.data, dict):
-                    sorted_keys = sorted(m.data.keys())
-                    for k in sorted_keys:
-                        if keys_to_show is not None and k not in keys_to_show:
-                            continue
-                        print(f'\t\t{k}: {m.data[k]}')
-                else:
-                    print("\t\t" + str(m.data))
-            print()
+    _list_rows(get_db(),
+               'get_experiments',
+               header_template=UUID_ROW_TEMPLATE,
+               header_fields=('uuid', 'creation_time', 'name', 'tags'),
+               label='\tExperiment :\n',
+               show_hidden=show_hidden,
+               show_data=show_data,
+               filter_fields=filter_fields,
+               uuid=uuid,
+               name_filter=name_filter,
+               after=after,
+               before=before,
+               skip_empty_data=False,
+               project_name=project)
 
 
 @list.command(name='projects')
@@ -134,53 +208,23 @@ def list_experiments(show_hidden, show_data, filter_fields, uuid, name_filter,
 @click.option('--filter_fields', type=str, default=None)
 @click.option('--uuid', type=str, default=None)
 @click.option('--name_filter', type=str, default=None)
-@click.option('--after', type=str, default=None)
-@click.option('--before', type=str, default=None)
+@click.option('--after', type=FlexDateTime(), default=None)
+@click.option('--before', type=FlexDateTime(), default=None)
 def list_projects(show_hidden, show_data, filter_fields, uuid, name_filter,
                   after, before):
-    projs = db.get_projects(show_hidden=show_hidden)
-    projs = sorted(projs, key=lambda x: x.creation_time)
-    if after is not None:
-        after_datetime = dateparser.parse(
-            after, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        projs = [
-            x for x in projs if x.creation_time.replace(
-                tzinfo=datetime.timezone.utc) >= after_datetime
-        ]
-    if before is not None:
-        before_datetime = dateparser.parse(
-            before, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        projs = [
-            x for x in projs if x.creation_time.replace(
-                tzinfo=datetime.timezone.utc) <= before_datetime
-        ]
-    if name_filter is not None:
-        projs = [x for x in projs if name_filter in x.name]
-
-    if uuid is not None:
-        exp = [x for x in exp if str(uuid) == str(x.uuid)]
-
-    for m in projs:
-        print(f'{m.name} : creation_time {m.creation_time}: {m.tags}', end='')
-        if show_hidden:
-            print(f'\thidden {m.hidden}')
-        else:
-            print()
-        if show_data and len(m.data) > 0:
-            print(f'\tDescription: {m.description}')
-            keys_to_show = None
-            if filter_fields is not None:
-                keys_to_show = filter_fields.split(',')
-            print('\tProject:')
-            if isinstance(m.data, dict):
-                sorted_keys = sorted(m.data.keys())
-                for k in sorted_keys:
-                    if keys_to_show is not None and k not in keys_to_show:
-                        continue
-                    print(f'\t\t{k}: {m.data[k]}')
-            else:
-                print("\t\t" + str(m.data))
-            print()
+    # Projects are keyed by name, so --uuid selects a project name.
+    _list_rows(get_db(),
+               'get_projects',
+               header_template=NAME_ROW_TEMPLATE,
+               header_fields=('name', 'creation_time', 'tags'),
+               label='\tProject:\n',
+               show_hidden=show_hidden,
+               show_data=show_data,
+               filter_fields=filter_fields,
+               uuid=uuid,
+               name_filter=name_filter,
+               after=after,
+               before=before)
 
 
 @list.command(name='experiment_states')
@@ -189,55 +233,22 @@ def list_projects(show_hidden, show_data, filter_fields, uuid, name_filter,
 @click.option('--filter_fields', type=str, default=None)
 @click.option('--uuid', type=str, default=None)
 @click.option('--name_filter', type=str, default=None)
-@click.option('--after', type=str, default=None)
-@click.option('--before', type=str, default=None)
+@click.option('--after', type=FlexDateTime(), default=None)
+@click.option('--before', type=FlexDateTime(), default=None)
 def list_experiment_states(show_hidden, show_data, filter_fields, uuid,
                            name_filter, after, before):
-    states = db.get_experiment_states(show_hidden=show_hidden)
-    states = sorted(states, key=lambda x: x.creation_time)
-    if after is not None:
-        after_datetime = dateparser.parse(
-            after, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        states = [
-            x for x in states if x.creation_time.replace(
-                tzinfo=datetime.timezone.utc) >= after_datetime
-        ]
-    if before is not None:
-        before_datetime = dateparser.parse(
-            before, settings={'RETURN_AS_TIMEZONE_AWARE': True})
-        states = [
-            x for x in states if x.creation_time.replace(
-                tzinfo=datetime.timezone.utc) <= before_datetime
-        ]
-    if name_filter is not None:
-        states = [x for x in states if name_filter in x.name]
-
-    if uuid is not None:
-        exp = [x for x in exp if str(uuid) == str(x.uuid)]
-
-    for m in states:
-        print(
-            f'{m.uuid} : creation_time {m.creation_time}  name {m.name} tags: {m.tags}',
-            end='')
-        if show_hidden:
-            print(f'\thidden {m.hidden}')
-        else:
-            print()
-        if show_data and len(m.data) > 0:
-            print(f'\tDescription: {m.description}')
-            keys_to_show = None
-            if filter_fields is not None:
-                keys_to_show = filter_fields.split(',')
-            print('\Experiment State:')
-            if isinstance(m.data, dict):
-                sorted_keys = sorted(m.data.keys())
-                for k in sorted_keys:
-                    if keys_to_show is not None and k not in keys_to_show:
-                        continue
-                    print(f'\t\t{k}: {m.data[k]}')
-            else:
-                print("\t\t" + str(m.data))
-            print()
+    _list_rows(get_db(),
+               'get_experiment_states',
+               header_template=UUID_ROW_TEMPLATE,
+               header_fields=('uuid', 'creation_time', 'name', 'tags'),
+               label='\\Experiment State:\n',
+               show_hidden=show_hidden,
+               show_data=show_data,
+               filter_fields=filter_fields,
+               uuid=uuid,
+               name_filter=name_filter,
+               after=after,
+               before=before)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,89 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from expdb import expdb
+
+
+class ExpDBTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        db_path = os.path.join(tmp_dir.name, 'expdb.db')
+        self.db = expdb.ExpDB(f'sqlite:///{db_path}')
+        self.db.create_project(name='proj', data={})
+
+    def create_experiments(self, names):
+        return [
+            self.db.create_experiment(project_name='proj', data={}, name=name)
+            for name in names
+        ]
+
+
+class CreationTimeFilterTest(ExpDBTestCase):
+    def test_bounds_at_the_creation_second(self):
+        # creation_time has whole second resolution on SQLite, so an exact
+        # bound has to match the rows created in that second.
+        exp, = self.create_experiments(['a'])
+        created = exp.creation_time
+        self.assertEqual(created.microsecond, 0)
+        for kwargs in ({'after': created}, {'before': created}):
+            self.assertEqual(
+                [x.uuid for x in self.db.get_experiments(**kwargs)],
+                [exp.uuid])
+
+    def test_fractional_bounds(self):
+        exp, = self.create_experiments(['a'])
+        half = datetime.timedelta(microseconds=500000)
+        created = exp.creation_time
+        self.assertEqual(self.db.get_experiments(after=created + half), [])
+        self.assertEqual(self.db.get_experiments(before=created - half), [])
+        self.assertEqual(
+            len(self.db.get_experiments(after=created - half,
+                                        before=created + half)), 1)
+
+    def test_hide_at_the_creation_second(self):
+        exp, = self.create_experiments(['a'])
+        self.assertEqual(
+            self.db.hide_experiments_bulk(after=exp.creation_time,
+                                          before=exp.creation_time), 1)
+
+
+class NameFilterTest(ExpDBTestCase):
+    def test_name_filter_is_case_sensitive(self):
+        self.create_experiments(['Alpha_1', 'alpha_2', 'beta'])
+        self.assertEqual(
+            sorted(x.name
+                   for x in self.db.get_experiments(name_contains='alpha')),
+            ['alpha_2'])
+        self.assertEqual(
+            [x.name for x in self.db.get_experiments(name_contains='A_1')],
+            [])
+        self.assertEqual(
+            [x.name for x in self.db.get_projects(name_contains='Proj')], [])
+
+
+class ReadCacheTest(ExpDBTestCase):
+    def test_cache_is_off_by_default(self):
+        exp, = self.create_experiments(['a'])
+        self.db.get_experiment(exp.uuid)
+        other = expdb.ExpDB(self.db.db_connection_string)
+        other.update_experiment_data(uuid=exp.uuid, data={'a': 1})
+        self.assertEqual(self.db.get_experiment(exp.uuid).data, {'a': 1})
+        other.hide_experiment(exp.uuid)
+        self.assertIsNone(
+            self.db.get_experiment(exp.uuid, assert_exists=False))
+
+    def test_cached_rows_are_copies(self):
+        db = expdb.ExpDB(self.db.db_connection_string, read_cache_size=16)
+        exp = db.create_experiment(project_name='proj',
+                                   data={'a': 1},
+                                   name='a')
+        db.get_experiment(exp.uuid).data['a'] = 999
+        db.get_experiment(exp.uuid).data['a'] = 999
+        self.assertEqual(db.get_experiment(exp.uuid).data, {'a': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()